@@ -1,10 +1,35 @@
-from importlib.metadata import version
-
-__version__ = version("snakemk_util")
+from typing import TYPE_CHECKING
 
 from .formatting import recursive_format
-from .rule_args import (
-    load_rule_args,
-    pretty_print_snakemake,
-    reload_snakemake,
-)
+
+if TYPE_CHECKING:
+    from .rule_args import (
+        load_rule_args,
+        pretty_print_snakemake,
+        reload_snakemake,
+    )
+
+# Importing snakemake and reading the package metadata take far longer than
+# shell completion may; resolve these attributes on first access instead.
+_RULE_ARGS_EXPORTS = ("load_rule_args", "pretty_print_snakemake", "reload_snakemake")
+
+__all__ = ["recursive_format", "load_rule_args", "pretty_print_snakemake", "reload_snakemake"]
+
+
+def __getattr__(name: str):
+    if name == "__version__":
+        from importlib.metadata import version
+
+        globals()["__version__"] = version("snakemk_util")
+        return globals()["__version__"]
+    if name == "rule_args" or name in _RULE_ARGS_EXPORTS:
+        # `from . import rule_args` would look up this very attribute first
+        from importlib import import_module
+
+        rule_args = import_module(".rule_args", __name__)
+        return rule_args if name == "rule_args" else getattr(rule_args, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | {"__version__", "rule_args"})
@@ -0,0 +1,315 @@
+"""
+Shell completion for the `snakemk_util` command line interface.
+
+Parsing a workflow requires importing snakemake, which is far too slow to do on every keypress.
+Completion is therefore served from a small rule index that is persisted in the user cache directory
+and rebuilt only when one of the Snakefiles in the include graph (or one of the loaded config files)
+has been modified.
+
+To enable completion in bash, add the following line to your `~/.bashrc`:
+    eval "$(_SNAKEMK_UTIL_COMPLETE=bash_source snakemk_util)"
+
+This module must not import snakemake at module level.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shlex
+import sys
+import time
+from contextlib import redirect_stdout, suppress
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+# Bump whenever the layout of the persisted index changes
+INDEX_FORMAT = 1
+
+# Parse failures are often caused by files outside of the include graph, e.g. a missing config file,
+# sample sheet or python module. Retry them after a short time instead of waiting for an edit.
+ERROR_RETRY_SECONDS = 5
+
+BASH_COMPLETION_SCRIPT = """\
+_snakemk_util_completion() {
+    local IFS=$'\\n'
+    COMPREPLY=($(COMP_LINE="$COMP_LINE" COMP_POINT="$COMP_POINT" _SNAKEMK_UTIL_COMPLETE=bash_complete "$1" 2>/dev/null))
+    # wildcard keys are completed as 'key=', leave the cursor right after the '='
+    if [[ ${#COMPREPLY[@]} -gt 0 && ${COMPREPLY[0]} == *= ]]; then
+        compopt -o nospace
+    fi
+}
+complete -o default -F _snakemk_util_completion snakemk_util
+"""
+
+
+def _cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "snakemk_util", "rule_index")
+
+
+def _resolve_paths(snakefile: str, root: str | None = None) -> tuple[str, str]:
+    """Resolve the root dir like `load_rule_args` and return absolute (snakefile, root) paths."""
+    if root is None:
+        root = os.path.dirname(snakefile)
+    elif not os.path.isabs(root):
+        root = os.path.join(os.path.dirname(snakefile), root)
+    root = os.path.abspath(root)
+
+    # the Snakefile gets included after changing into the root directory
+    snakefile = os.path.join(root, snakefile)
+    return os.path.normpath(snakefile), root
+
+
+def _index_path(snakefile: str, root: str) -> str:
+    key = hashlib.sha1(f"{snakefile}\0{root}".encode()).hexdigest()
+    return os.path.join(_cache_dir(), key + ".json")
+
+
+def _mtimes(paths) -> dict[str, int]:
+    return {p: os.stat(p).st_mtime_ns for p in paths}
+
+
+def _is_current(index: dict, snakefile: str, root: str) -> bool:
+    if index.get("format") != INDEX_FORMAT or index.get("snakefile") != snakefile or index.get("root") != root:
+        return False
+    if "error" in index and time.time() - index.get("created", 0) > ERROR_RETRY_SECONDS:
+        return False
+    try:
+        return _mtimes(index["sources"]) == index["sources"]
+    except OSError:
+        # some source file has been removed
+        return False
+
+
+def _read_index(path: str) -> dict | None:
+    try:
+        with open(path) as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_index(path: str, index: dict) -> None:
+    # write to a temporary file first so that concurrent readers never see a partial index
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "w") as fd:
+            json.dump(index, fd)
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        log.debug("Could not write rule index %s: %s", path, exc)
+        with suppress(OSError):
+            os.unlink(tmp_path)
+
+
+def _build_rule_index(snakefile: str, root: str) -> dict:
+    """
+    Parse the workflow with snakemake and collect everything needed for completion.
+
+    If the workflow cannot be parsed, the error is recorded in the index instead of the rules,
+    such that a broken workflow is not parsed again on every keypress (see `ERROR_RETRY_SECONDS`).
+    """
+    from snakemake.io import WILDCARD_REGEX
+
+    from snakemk_util.rule_args import _init_workflow
+
+    index: dict = {
+        "format": INDEX_FORMAT,
+        "snakefile": snakefile,
+        "root": root,
+        "created": time.time(),
+    }
+
+    cwd = os.getcwd()
+    workflow = None
+    try:
+        os.chdir(root)
+
+        # Snakefiles may print arbitrary output which must not end up in the completion candidates
+        with redirect_stdout(sys.stderr):
+            workflow = _init_workflow(root)
+            workflow.include(snakefile)
+
+        rules = {}
+        for rule in workflow.rules:
+            output = [str(f) for f in rule.output]
+            wildcards = dict.fromkeys(m.group("name") for pattern in output for m in WILDCARD_REGEX.finditer(pattern))
+            rules[rule.name] = {
+                "wildcards": list(wildcards),
+                "output": output,
+            }
+        index["rules"] = rules
+    except Exception as exc:
+        log.debug("Could not parse workflow %s", snakefile, exc_info=True)
+        index["error"] = str(exc) or type(exc).__name__
+    finally:
+        sources = [snakefile]
+        if workflow is not None:
+            # on failure, this includes all files up to the one that could not be parsed
+            sources += [f.get_path_or_uri(secret_free=True) for f in workflow.included]
+            sources += workflow.configfiles
+        # remote includes cannot be tracked by their mtime
+        sources = [os.path.abspath(p) for p in sources if os.path.isfile(p)]
+        os.chdir(cwd)
+
+    index["sources"] = _mtimes(dict.fromkeys(sources))
+    return index
+
+
+def load_rule_index(snakefile: str, root: str | None = None) -> dict[str, dict[str, list[str]]]:
+    """
+    Return the rules of a workflow together with their wildcard names and output patterns.
+
+    The index is read from the cache if none of the included Snakefiles and config files
+    has been modified since it was built. Otherwise, the workflow is parsed again.
+    Note that changes in imported python modules are not tracked.
+
+    :param snakefile: path to the root Snakefile
+    :param root: Root directory from where you would run the `snakemake` command.
+      By default, this is the folder that contains the root Snakefile (see the `snakefile` argument).
+    :return: dictionary mapping rule names to `{"wildcards": [...], "output": [...]}`
+    :raises FileNotFoundError: if the Snakefile does not exist
+    :raises ValueError: if the workflow could not be parsed
+    """
+    snakefile, root = _resolve_paths(snakefile, root)
+    if not os.path.isfile(snakefile):
+        raise FileNotFoundError(f"Snakefile not found: '{snakefile}'")
+    path = _index_path(snakefile, root)
+
+    index = _read_index(path)
+    if index is None or not _is_current(index, snakefile, root):
+        log.debug("Rebuilding rule index for %s", snakefile)
+        mtime = os.stat(snakefile).st_mtime_ns
+        index = _build_rule_index(snakefile, root)
+        # a source file saved while parsing would pair its new mtime with the rules of the old content
+        if index["sources"].get(snakefile) == mtime and _is_current(index, snakefile, root):
+            _write_index(path, index)
+        else:
+            log.debug("Workflow %s was modified while parsing, not persisting the rule index", snakefile)
+
+    if "error" in index:
+        raise ValueError(f"Could not parse workflow '{snakefile}': {index['error']}")
+    return index["rules"]
+
+
+def _parse_words(parser: argparse.ArgumentParser, words: list[str]) -> tuple[dict[str, Any], str | None]:
+    """
+    Collect the option values from the already completed words.
+
+    Returns the option values by destination and the destination of the option
+    that still consumes the next word, if any.
+    """
+    actions = {opt: action for action in parser._actions for opt in action.option_strings}
+    values = {action.dest: action.default for action in parser._actions}
+
+    pending = None
+    for word in words:
+        opt, sep, value = word.partition("=")
+        if opt not in actions and opt.startswith("--"):
+            # argparse accepts unique prefixes of long options
+            matches = [option for option in actions if option.startswith(opt)]
+            if len(matches) == 1:
+                opt = matches[0]
+        if opt in actions:
+            action = actions[opt]
+            pending = None
+            if action.nargs == "*":
+                values[action.dest] = [value] if sep else []
+                pending = action
+            elif sep:
+                values[action.dest] = value
+            elif action.nargs != 0:
+                pending = action
+        elif pending is not None:
+            if pending.nargs == "*":
+                values[pending.dest].append(word)
+            else:
+                values[pending.dest] = word
+                pending = None
+
+    return values, pending.dest if pending is not None else None
+
+
+def complete(words: list[str], incomplete: str) -> list[str]:
+    """
+    Return the completion candidates for a partially typed command line.
+
+    :param words: the words preceding the one being completed, without the program name
+    :param incomplete: the (possibly empty) word being completed
+    """
+    from snakemk_util.main import build_parser
+
+    parser = build_parser()
+    if incomplete.startswith("-"):
+        opt, sep, incomplete = incomplete.partition("=")
+        if not sep:
+            return [o for action in parser._actions for o in action.option_strings if o.startswith(opt)]
+        # `--option=value` form; bash only replaces the part after the '='
+        words = words + [opt]
+
+    values, dest = _parse_words(parser, words)
+    if dest not in ("rule_name", "wildcards"):
+        # let the shell fall back to its default completion
+        return []
+
+    # the shell passes the command line without expanding it
+    snakefile = os.path.expanduser(os.path.expandvars(values["snakefile"]))
+    root = os.path.expanduser(os.path.expandvars(values["root_dir"]))
+    try:
+        rules = load_rule_index(snakefile, root=root)
+    except Exception as exc:
+        log.debug("Could not load rule index for %s: %s", snakefile, exc)
+        return []
+
+    if dest == "rule_name":
+        return [name for name in rules if name.startswith(incomplete)]
+
+    rule = rules.get(values["rule_name"])
+    if rule is None or "=" in incomplete:
+        # wildcard values cannot be completed
+        return []
+    given = {entry.partition("=")[0] for entry in values["wildcards"]}
+    return [f"{name}=" for name in rule["wildcards"] if name not in given and name.startswith(incomplete)]
+
+
+def _split_line(line: str) -> list[str]:
+    """Split a partially typed command line into words like the shell would."""
+    # the word being completed may still have an unterminated quote
+    for closing_quote in ("", '"', "'"):
+        try:
+            return shlex.split(line + closing_quote)
+        except ValueError:
+            pass
+    return line.split()
+
+
+def shell_complete(instruction: str) -> int:
+    """
+    Entry point for the shell integration, triggered by the `_SNAKEMK_UTIL_COMPLETE` environment variable.
+
+    :param instruction: `bash_source` to print the completion script,
+        `bash_complete` to print the candidates for `$COMP_LINE` at `$COMP_POINT`
+    :return: exit code
+    """
+    if instruction == "bash_source":
+        print(BASH_COMPLETION_SCRIPT, end="")
+        return 0
+    elif instruction == "bash_complete":
+        line = os.environ.get("COMP_LINE", "")
+        line = line[: int(os.environ.get("COMP_POINT", len(line)))]
+        words = _split_line(line)
+        if not line or line[-1].isspace():
+            words.append("")
+
+        for candidate in complete(words[1:-1], words[-1]):
+            print(candidate)
+        return 0
+    else:
+        print(f"Unknown completion instruction: '{instruction}'", file=sys.stderr)
+        return 1
@@ -10,8 +10,11 @@ from contextlib import redirect_stdout
 # identifiers since wildcards are bound to attribute access.
 _VALID_WILDCARD_NAME = re.compile(r"^[a-zA-Z_]\w*$")
 
+# Set by the shell completion script, see `snakemk_util.completion`.
+_COMPLETE_ENV_VAR = "_SNAKEMK_UTIL_COMPLETE"
 
-def main():
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description=textwrap.dedent("""
     Utility to sow Snakemake rule contents and creating script preambles without actually running Snakemake.
@@ -71,6 +74,16 @@ def main():
         default=False,
         help="Create the output directories for the rule",
     )
+    return parser
+
+
+def main():
+    if _COMPLETE_ENV_VAR in os.environ:
+        from snakemk_util.completion import shell_complete
+
+        sys.exit(shell_complete(os.environ[_COMPLETE_ENV_VAR]))
+
+    parser = build_parser()
     args = parser.parse_args()
 
     from snakemake.common import parse_key_value_arg
@@ -90,6 +90,22 @@ def mk_dirs(paths: str | list | dict) -> None:
             os.makedirs(dest_folder)
 
 
+def _init_workflow(root: str) -> Workflow:
+    """Create an empty workflow with default settings, ready to include a Snakefile."""
+    return Workflow(
+        resource_settings=snakemake.workflow.ResourceSettings(),
+        config_settings=snakemake.workflow.ConfigSettings(),
+        storage_settings=snakemake.workflow.StorageSettings(),
+        workflow_settings=snakemake.workflow.WorkflowSettings(),
+        deployment_settings=snakemake.workflow.DeploymentSettings(),
+        logger_manager=LoggerManager(
+            logging.getLogger("snakemake"),
+            OutputSettings(),
+        ),
+        overwrite_workdir=root,
+    )
+
+
 def _pretty_format_smk(snakemake_obj: object) -> object:
     if isinstance(snakemake_obj, Namedlist):
         # directly build string representation
@@ -209,18 +225,7 @@ def load_rule_args(
         os.chdir(root)
 
         # load workflow
-        workflow = Workflow(
-            resource_settings=snakemake.workflow.ResourceSettings(),
-            config_settings=snakemake.workflow.ConfigSettings(),
-            storage_settings=snakemake.workflow.StorageSettings(),
-            workflow_settings=snakemake.workflow.WorkflowSettings(),
-            deployment_settings=snakemake.workflow.DeploymentSettings(),
-            logger_manager=LoggerManager(
-                logging.getLogger("snakemake"),
-                OutputSettings(),
-            ),
-            overwrite_workdir=root,
-        )
+        workflow = _init_workflow(root)
         workflow.include(snakefile)
         # get rule
         rule = workflow.get_rule(rule_name)
@@ -1,4 +1,29 @@
 import logging
+import os
+import shutil
+
+import pytest
 
 logging.basicConfig()
 logging.getLogger("snakemk_util").setLevel(logging.DEBUG)
+
+
+@pytest.fixture(scope="function")
+def workflow_dir(tmpdir_factory, monkeypatch):
+    dn = tmpdir_factory.mktemp("workflow_dir")
+    path = str(dn)
+
+    # keep the rule index of shell completion out of the user's cache
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(path, "cache"))
+
+    return path
+
+
+@pytest.fixture(scope="session")
+def copy_data():
+    def copy(workflow_dir, data_subdir):
+        target_dirname = os.path.join(workflow_dir, data_subdir)
+        shutil.copytree(f"tests/data/{data_subdir}", target_dirname)
+        return target_dirname
+
+    return copy
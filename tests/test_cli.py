@@ -18,3 +18,24 @@ def test_main():
             stdout=subprocess.PIPE,
         ).stdout
     )
+
+
+def test_lazy_imports():
+    # the command line entry point must not pull in snakemake before it is needed
+    script = (
+        "import sys, snakemk_util.main; assert 'snakemake' not in sys.modules; "
+        "import snakemk_util; assert callable(snakemk_util.load_rule_args); assert 'snakemake' in sys.modules"
+    )
+    assert subprocess.run(["python", "-c", script]).returncode == 0
+
+
+def test_public_api():
+    import snakemk_util
+
+    exports = {"recursive_format", "load_rule_args", "pretty_print_snakemake", "reload_snakemake"}
+    namespace: dict = {"__version__": "mine"}
+    exec("from snakemk_util import *", namespace)
+    assert exports <= set(namespace)
+    assert namespace["__version__"] == "mine"
+    assert exports | {"__version__", "rule_args"} <= set(dir(snakemk_util))
+    assert snakemk_util.rule_args.load_rule_args is snakemk_util.load_rule_args
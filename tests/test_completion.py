@@ -0,0 +1,189 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from snakemk_util import completion
+from snakemk_util.completion import complete, load_rule_index
+
+
+def test_rule_index(workflow_dir, copy_data):
+    workflow_dir = copy_data(workflow_dir, "test_rule_args")
+
+    rules = load_rule_index(snakefile=workflow_dir + "/Snakefile")
+
+    assert list(rules) == ["all", "samplerule"]
+    assert rules["samplerule"] == {"wildcards": ["ds_dir"], "output": ["{ds_dir}/out.txt"]}
+
+
+def test_rule_index_invalidation(workflow_dir, copy_data, mocker):
+    workflow_dir = copy_data(workflow_dir, "test_rule_args_workdir")
+    snakefile_path = workflow_dir + "/workflow/Snakefile"
+
+    rules = load_rule_index(snakefile=snakefile_path, root="../")
+    assert "samplerule" in rules
+
+    # the persisted index is used as long as no source file changes
+    build = mocker.spy(completion, "_build_rule_index")
+    assert load_rule_index(snakefile=snakefile_path, root="../") == rules
+    assert build.call_count == 0
+
+    # modifying an included Snakefile or config file invalidates the index
+    for path in ["workflow/side.smk", "configs/config.yaml"]:
+        stat = os.stat(os.path.join(workflow_dir, path))
+        os.utime(os.path.join(workflow_dir, path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        load_rule_index(snakefile=snakefile_path, root="../")
+    assert build.call_count == 2
+
+
+def test_rule_index_modified_while_parsing(workflow_dir, copy_data, mocker):
+    workflow_dir = copy_data(workflow_dir, "test_rule_args")
+    snakefile_path = workflow_dir + "/Snakefile"
+    build_rule_index = completion._build_rule_index
+
+    def build_and_modify(snakefile, root):
+        index = build_rule_index(snakefile, root)
+        stat = os.stat(snakefile_path)
+        os.utime(snakefile_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        return index
+
+    mocker.patch.object(completion, "_build_rule_index", side_effect=build_and_modify)
+    assert "samplerule" in load_rule_index(snakefile=snakefile_path)
+
+    # the index of the outdated content was not persisted
+    assert not os.path.exists(completion._index_path(*completion._resolve_paths(snakefile_path)))
+
+
+def test_rule_index_missing_snakefile(workflow_dir, mocker):
+    build = mocker.spy(completion, "_build_rule_index")
+
+    with pytest.raises(FileNotFoundError):
+        load_rule_index(snakefile=workflow_dir + "/Snakefile")
+    assert complete(["--snakefile", workflow_dir + "/Snakefile", "--rule"], "") == []
+    assert build.call_count == 0
+
+
+def test_rule_index_broken_workflow(workflow_dir, mocker, monkeypatch):
+    snakefile_path = workflow_dir + "/Snakefile"
+    with open(snakefile_path, "w") as fd:
+        fd.write("configfile: 'config.yaml'\n\nrule samplerule:\n  output: '{sample}.txt'\n  shell: 'echo'\n")
+
+    with pytest.raises(ValueError):
+        load_rule_index(snakefile=snakefile_path)
+
+    # the failure is persisted for a short time to avoid parsing the workflow on every keypress
+    build = mocker.spy(completion, "_build_rule_index")
+    with pytest.raises(ValueError):
+        load_rule_index(snakefile=snakefile_path)
+    assert build.call_count == 0
+
+    # the cause of the failure is outside of the Snakefile, so it is only picked up after the retry time
+    with open(workflow_dir + "/config.yaml", "w") as fd:
+        fd.write("key: value\n")
+    monkeypatch.setattr(completion, "ERROR_RETRY_SECONDS", 0)
+    assert load_rule_index(snakefile=snakefile_path)["samplerule"]["wildcards"] == ["sample"]
+    assert build.call_count == 1
+
+
+def test_write_index_failure(workflow_dir, mocker):
+    path = os.path.join(workflow_dir, "index.json")
+    mocker.patch("os.replace", side_effect=OSError("read-only"))
+
+    completion._write_index(path, {"format": completion.INDEX_FORMAT})
+
+    assert os.listdir(workflow_dir) == []
+
+
+def test_complete(workflow_dir, copy_data):
+    workflow_dir = copy_data(workflow_dir, "test_rule_args")
+    args = ["--snakefile", workflow_dir + "/Snakefile", "--root_dir", workflow_dir]
+
+    assert complete(args + ["--rule"], "") == ["all", "samplerule"]
+    assert complete(args + ["--rule"], "s") == ["samplerule"]
+    assert complete(args, "--rule=s") == ["samplerule"]
+    assert complete(args, "--wild") == ["--wildcards"]
+    assert complete(args + ["--rule", "samplerule", "--wildcards"], "") == ["ds_dir="]
+    assert complete(args + ["--rule", "samplerule", "--wildcards", "ds_dir=x"], "") == []
+    assert complete(args + ["--rule", "samplerule", "--wildcards"], "ds_dir=") == []
+    assert complete(args + ["--snakefile"], "") == []
+
+    # abbreviated options are resolved like argparse does
+    abbreviated = ["--snake", workflow_dir + "/Snakefile", "--root", workflow_dir]
+    assert complete(abbreviated + ["--ru"], "") == ["all", "samplerule"]
+    assert complete(abbreviated + ["--ru", "samplerule", "--wild"], "") == ["ds_dir="]
+    assert complete(abbreviated, "--ru=s") == ["samplerule"]
+
+
+def test_complete_home_relative(workflow_dir, copy_data, monkeypatch):
+    copy_data(workflow_dir, "test_rule_args")
+    monkeypatch.setenv("HOME", workflow_dir)
+    monkeypatch.setenv("WORKFLOW_DIR", workflow_dir + "/test_rule_args")
+
+    assert complete(["--snakefile", "~/test_rule_args/Snakefile", "--rule"], "s") == ["samplerule"]
+    assert complete(["--snakefile", "$WORKFLOW_DIR/Snakefile", "--root_dir", "~", "--rule"], "s") == ["samplerule"]
+
+
+def test_complete_without_snakemake(workflow_dir, copy_data):
+    workflow_dir = copy_data(workflow_dir, "test_rule_args")
+    load_rule_index(snakefile=workflow_dir + "/Snakefile")
+
+    # completion from a persisted index must not import snakemake
+    script = (
+        "import sys; from snakemk_util.completion import complete; "
+        "print(complete(sys.argv[1:], '')); assert 'snakemake' not in sys.modules"
+    )
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            script,
+            "--snakefile",
+            workflow_dir + "/Snakefile",
+            "--root_dir",
+            workflow_dir,
+            "--rule",
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    assert result.stdout.decode().strip() == "['all', 'samplerule']"
+
+
+def run_completion(comp_line, comp_point=None, instruction="bash_complete"):
+    env = {**os.environ, "_SNAKEMK_UTIL_COMPLETE": instruction, "COMP_LINE": comp_line}
+    if comp_point is not None:
+        env["COMP_POINT"] = str(comp_point)
+    result = subprocess.run(
+        ["python", "-m", "snakemk_util.main"],
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return result.stdout.decode().splitlines()
+
+
+def test_shell_complete(workflow_dir, copy_data):
+    workflow_dir = copy_data(workflow_dir, "test_rule_args")
+    cmd = f"snakemk_util --snakefile {workflow_dir}/Snakefile --root_dir {workflow_dir}"
+
+    assert run_completion(f"{cmd} --rule ") == ["all", "samplerule"]
+    assert run_completion(f"{cmd} --rule s") == ["samplerule"]
+    assert run_completion(f'{cmd} --rule "s') == ["samplerule"]
+    assert run_completion(f"{cmd} --rule samplerule --wildcards ") == ["ds_dir="]
+    # only the part of the line before the cursor is completed
+    assert run_completion(f"{cmd} --rule s --wildcards ds_dir=x", comp_point=len(cmd) + 9) == ["samplerule"]
+    # without a trailing space, the option itself is completed
+    assert run_completion(f"{cmd} --rule") == ["--rule"]
+
+
+def test_shell_complete_source():
+    script = run_completion("", instruction="bash_source")
+    assert "complete -o default -F _snakemk_util_completion snakemk_util" in script
+
+    result = subprocess.run(
+        ["python", "-m", "snakemk_util.main"],
+        env={**os.environ, "_SNAKEMK_UTIL_COMPLETE": "unknown"},
+        stdout=subprocess.PIPE,
+    )
+    assert result.returncode == 1
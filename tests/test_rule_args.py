@@ -1,26 +1,9 @@
 import os
-import shutil
-
-import pytest
 
 from snakemk_util import load_rule_args, pretty_print_snakemake
 
 
-@pytest.fixture(scope="function")
-def workflow_dir(tmpdir_factory):
-    dn = tmpdir_factory.mktemp("workflow_dir")
-    path = str(dn)
-
-    return path
-
-
-def copy_data(workflow_dir, data_subdir):
-    target_dirname = os.path.join(workflow_dir, data_subdir)
-    shutil.copytree(f"tests/data/{data_subdir}", target_dirname)
-    return target_dirname
-
-
-def test_rule_args(workflow_dir):
+def test_rule_args(workflow_dir, copy_data):
     workflow_dir = copy_data(workflow_dir, "test_rule_args")
 
     snakefile_path = workflow_dir + "/Snakefile"
@@ -36,7 +19,7 @@ def test_rule_args(workflow_dir):
     assert os.path.isdir(workflow_dir + "/testdir")
 
 
-def test_reload(workflow_dir):
+def test_reload(workflow_dir, copy_data):
     workflow_dir = copy_data(workflow_dir, "test_rule_args")
 
     snakefile_path = workflow_dir + "/Snakefile"
@@ -65,7 +48,7 @@ def test_reload(workflow_dir):
     assert x == y
 
 
-def test_rule_args_workdir(workflow_dir):
+def test_rule_args_workdir(workflow_dir, copy_data):
     workflow_dir = copy_data(workflow_dir, "test_rule_args_workdir")
 
     snakefile_path = workflow_dir + "/workflow/Snakefile"
@@ -77,7 +60,7 @@ def test_rule_args_workdir(workflow_dir):
     assert os.path.isdir(workflow_dir + "/testdir")
 
 
-def test_rule_args_workdir_pythonrule(workflow_dir):
+def test_rule_args_workdir_pythonrule(workflow_dir, copy_data):
     workflow_dir = copy_data(workflow_dir, "test_rule_args_workdir")
 
     snakefile_path = workflow_dir + "/workflow/Snakefile"
@@ -89,7 +72,7 @@ def test_rule_args_workdir_pythonrule(workflow_dir):
     assert os.path.isdir(workflow_dir + "/testdir")
 
 
-def test_named_params(workflow_dir):
+def test_named_params(workflow_dir, copy_data):
     """Regression test: named params in a rule must be addressable by name on
     the loaded Snakemake object. Previously the tuple returned by
     rule.expand_params was passed to Params() without indexing [0], which
@@ -113,7 +96,7 @@ def test_named_params(workflow_dir):
     assert snakemake.params["nb_script"] == "script.py"
 
 
-def test_output_args(workflow_dir):
+def test_output_args(workflow_dir, copy_data):
     workflow_dir = copy_data(workflow_dir, "test_output_args")
 
     snakefile_path = workflow_dir + "/Snakefile"